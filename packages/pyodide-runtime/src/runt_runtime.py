@@ -27,7 +27,7 @@ from runt_runtime_display import (
     js_execution_callback,
     js_clear_callback,
 )
-from runt_runtime_bootstrap import bootstrap_micropip_packages
+from runt_runtime_bootstrap import bootstrap_micropip_packages, wait_for_package
 from runt_runtime_interrupt_patches import setup_interrupt_patches, check_interrupt
 
 __all__ = [
@@ -45,6 +45,7 @@ __all__ = [
     "js_clear_callback",
     # Bootstrap utilities
     "bootstrap_micropip_packages",
+    "wait_for_package",
     # Interrupt handling
     "setup_interrupt_patches",
     "check_interrupt",
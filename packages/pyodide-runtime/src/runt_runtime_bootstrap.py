@@ -6,13 +6,33 @@ with necessary packages, particularly for micropip package installation
 and environment setup.
 """
 
+import asyncio
+import importlib.util
+
 import micropip
 
 
 # Package loading state tracking
 _critical_packages_loaded = False
 _background_loading_started = False
+_background_task = None
 _loaded_packages = set()
+# Set once an install attempt for the package finishes, so waiters don't poll
+_package_events = {}
+# Installs started by wait_for_package, kept referenced until they finish
+_install_tasks = set()
+
+
+def _event_for(package_name: str) -> asyncio.Event:
+    """Get the completion event for a pending package install
+
+    An event left set by an earlier attempt is replaced, so a new install
+    can be waited on again.
+    """
+    event = _package_events.get(package_name)
+    if event is None or event.is_set():
+        event = _package_events[package_name] = asyncio.Event()
+    return event
 
 
 def _configure_matplotlib_backend():
@@ -27,6 +47,41 @@ def _configure_matplotlib_backend():
         print(f"Warning: Failed to configure matplotlib backend: {e}")
 
 
+async def _install_batch(packages: list) -> dict:
+    """Install packages with a single micropip resolve
+
+    micropip fails the whole batch if any requirement cannot be installed, so
+    on failure fall back to concurrent per-package installs to keep the ones
+    that do resolve.
+
+    Returns:
+        Mapping of package name to the error for packages that failed
+    """
+    events = [_event_for(package) for package in packages]
+    try:
+        try:
+            await micropip.install(packages)
+            _loaded_packages.update(packages)
+            return {}
+        except Exception:
+            pass
+
+        failures = {}
+        results = await asyncio.gather(
+            *(micropip.install(package) for package in packages),
+            return_exceptions=True,
+        )
+        for package, result in zip(packages, results):
+            if isinstance(result, BaseException):
+                failures[package] = result
+            else:
+                _loaded_packages.add(package)
+        return failures
+    finally:
+        for event in events:
+            event.set()
+
+
 async def bootstrap_micropip_packages():
     """Bootstrap essential micropip packages for the runtime environment
 
@@ -45,17 +100,14 @@ async def bootstrap_micropip_packages():
         "matplotlib",  # Required for pandas plotting and general plotting
     ]
 
-    # Load critical packages synchronously
+    # Load critical packages before user code runs, fetching them concurrently
     print("Loading critical packages synchronously...")
     failed_critical = []
 
-    for package in critical_packages:
-        try:
-            await micropip.install(package)
-            _loaded_packages.add(package)
-        except Exception as e:
-            failed_critical.append(package)
-            print(f"Warning: Failed to install critical package {package}: {e}")
+    failures = await _install_batch(critical_packages)
+    for package, error in failures.items():
+        failed_critical.append(package)
+        print(f"Warning: Failed to install critical package {package}: {error}")
 
     _critical_packages_loaded = True
 
@@ -68,7 +120,7 @@ async def bootstrap_micropip_packages():
 
 async def _start_background_package_loading():
     """Start loading additional packages in the background"""
-    global _background_loading_started
+    global _background_loading_started, _background_task
 
     if _background_loading_started:
         return
@@ -86,27 +138,33 @@ async def _start_background_package_loading():
         "pillow",  # Image processing
     ]
 
-    # Background installation with minimal output
-
-    # Use asyncio to load packages concurrently in background
-    import asyncio
-
-    async def load_package_background(package):
-        try:
-            await micropip.install(package)
-            _loaded_packages.add(package)
-        except Exception as e:
-            # Continue silently for background packages
-            pass
-
-    # Fire and forget - don't wait for completion
+    # Create the events now rather than when the task first runs, so that
+    # waiters in between don't start a duplicate install
     for package in background_packages:
-        asyncio.create_task(load_package_background(package))
+        _event_for(package)
+
+    # Background installation with minimal output; failures are ignored
+    # Fire and forget - don't wait for completion. The event loop only keeps a
+    # weak reference to tasks, so hold on to it until it finishes.
+    _background_task = asyncio.create_task(_install_batch(background_packages))
 
 
 def is_package_loaded(package_name: str) -> bool:
     """Check if a specific package has been loaded"""
-    return package_name in _loaded_packages
+    if package_name in _loaded_packages:
+        return True
+
+    # Packages preloaded into the Pyodide image never go through micropip,
+    # so check whether they are importable and remember the answer. Misses
+    # are not cached since the package may be installed later.
+    try:
+        importable = importlib.util.find_spec(package_name) is not None
+    except (ImportError, ValueError):
+        importable = False
+
+    if importable:
+        _loaded_packages.add(package_name)
+    return importable
 
 
 def are_critical_packages_loaded() -> bool:
@@ -114,6 +172,22 @@ def are_critical_packages_loaded() -> bool:
     return _critical_packages_loaded
 
 
+def _start_install(package_name: str) -> asyncio.Task:
+    """Install a single package in a task that waiters can share"""
+    event = _event_for(package_name)
+
+    def _finished(task):
+        _install_tasks.discard(task)
+        if not task.cancelled() and task.exception() is None:
+            _loaded_packages.add(package_name)
+        event.set()
+
+    task = asyncio.ensure_future(micropip.install(package_name))
+    _install_tasks.add(task)
+    task.add_done_callback(_finished)
+    return task
+
+
 async def wait_for_package(package_name: str, timeout_seconds: int = 30) -> bool:
     """Wait for a specific package to be available, with timeout
 
@@ -124,29 +198,38 @@ async def wait_for_package(package_name: str, timeout_seconds: int = 30) -> bool
     Returns:
         True if package is available, False if timeout
     """
-    import asyncio
-
     # Check if already loaded
     if is_package_loaded(package_name):
         return True
 
-    # Try to load the package if not already loaded
-    if package_name not in _loaded_packages:
+    loop = asyncio.get_running_loop()
+    deadline = loop.time() + timeout_seconds
+
+    # Wait for an install that is still under way
+    event = _package_events.get(package_name)
+    if event is not None and not event.is_set():
         try:
-            await micropip.install(package_name)
-            _loaded_packages.add(package_name)
-            return True
-        except Exception as e:
+            await asyncio.wait_for(event.wait(), timeout_seconds)
+        except asyncio.TimeoutError:
+            # Silent timeout - package may still be loading in background
             return False
 
-    # Wait for background loading with timeout
-    for _ in range(timeout_seconds * 10):  # Check every 100ms
         if is_package_loaded(package_name):
             return True
-        await asyncio.sleep(0.1)
 
-    # Silent timeout - package may still be loading in background
-    return False
+    # No install under way, or it failed: try to load the package within what
+    # is left of the timeout. On timeout the install carries on in the
+    # background rather than being cancelled part way through.
+    try:
+        await asyncio.wait_for(
+            asyncio.shield(_start_install(package_name)),
+            max(deadline - loop.time(), 0),
+        )
+        return True
+    except asyncio.TimeoutError:
+        return False
+    except Exception as e:
+        return False
 
 
 def get_package_loading_status():
@@ -8,33 +8,26 @@ This module provides rich display capabilities including:
 - Serialization utilities for complex Python objects
 """
 
+import importlib.abc
+import importlib.util
 import io
+import sys
 
 from IPython.core.displaypub import DisplayPublisher
 from IPython.core.displayhook import DisplayHook
 
-# Configure matplotlib backend early for WebWorker compatibility
-try:
-    import matplotlib
+# zlib level for inline plot PNGs. Encoding dominates plt.show() at the default
+# level 6; level 1 is several times faster for slightly larger images.
+PNG_COMPRESS_LEVEL = 1
 
-    # Set Agg backend for WebWorker compatibility
-    matplotlib.use("Agg", force=True)
-
-    # Configure for headless operation
-    import matplotlib.pyplot as plt
+# Reused across plt.show() calls so savefig writes into an already-grown buffer.
+# The worker runs one cell at a time and the PNG is encoded before anything is
+# displayed, so calls never overlap on it.
+_PNG_BUF = io.BytesIO()
 
-    plt.rcParams["figure.dpi"] = 100
-    plt.rcParams["savefig.dpi"] = 100
-    plt.rcParams["figure.facecolor"] = "white"
-    plt.rcParams["savefig.facecolor"] = "white"
-    plt.rcParams["figure.figsize"] = (8, 6)
-    plt.rcParams["axes.facecolor"] = "white"
 
-    print("Matplotlib configured with Agg backend for WebWorker compatibility")
-except ImportError:
-    print("Matplotlib not available during backend configuration")
-except Exception as e:
-    print(f"Warning: Failed to configure matplotlib backend: {e}")
+def _noop_callback(*args, **kwargs):
+    """Default callback until the worker attaches a JavaScript one"""
 
 
 class RichDisplayPublisher(DisplayPublisher):
@@ -42,7 +35,8 @@ class RichDisplayPublisher(DisplayPublisher):
 
     def __init__(self, shell=None, *args, **kwargs):
         super(RichDisplayPublisher, self).__init__(shell=shell, *args, **kwargs)
-        self.js_callback = None
+        self.js_callback = _noop_callback
+        self.js_clear_callback = _noop_callback
 
     def publish(
         self,
@@ -54,18 +48,21 @@ class RichDisplayPublisher(DisplayPublisher):
         update=False,
     ):
         """Publish with JavaScript callback using IPython's formatted data"""
-        # Call our JavaScript callback with the formatted data if available
-        if self.js_callback:
+        # Call our JavaScript callback with the formatted data if available.
+        # Compare by identity: truth-testing a JS proxy crosses into JavaScript.
+        js_callback = self.js_callback
+        if js_callback is not _noop_callback:
             try:
-                self.js_callback(data, metadata, transient, update)
+                js_callback(data, metadata, transient, update)
             except Exception as e:
                 print(f"Error in display callback: {e}")
 
     def clear_output(self, wait=False):
         """Clear output with JavaScript callback"""
-        if hasattr(self, "js_clear_callback") and self.js_clear_callback:
+        js_clear_callback = self.js_clear_callback
+        if js_clear_callback is not _noop_callback:
             try:
-                self.js_clear_callback(wait)
+                js_clear_callback(wait)
             except Exception as e:
                 print(f"Error in clear callback: {e}")
 
@@ -77,41 +74,62 @@ class RichDisplayHook(DisplayHook):
         super(RichDisplayHook, self).__init__(
             shell=shell, cache_size=cache_size, **kwargs
         )
-        self.js_callback = None
+        self.js_callback = _noop_callback
+        # Bound lazily: the shell's display formatter may not exist yet while
+        # the shell is still constructing this hook
+        self._format = None
+
+    def _bind_format(self):
+        """Resolve and cache the shell's display formatter"""
+        shell = self.shell
+        if shell and hasattr(shell, "display_formatter"):
+            self._format = shell.display_formatter.format
+        return self._format
 
     def __call__(self, result):
         """Process execution results using IPython's formatters"""
-        if result is not None:
-            # Auto-show matplotlib plots if result is a matplotlib object
-            try:
-                self._auto_show_matplotlib_if_needed(result)
-            except Exception as e:
-                print(f"Error in matplotlib auto-show: {e}")
-
-            # Use IPython's formatters to get properly formatted display data
-            if self.shell and hasattr(self.shell, "display_formatter"):
-                format_dict, metadata_dict = self.shell.display_formatter.format(result)
-
-                # Call our JavaScript callback with formatted data
-                if self.js_callback:
-                    try:
-                        execution_count = getattr(self.shell, "execution_count", 0)
-                        self.js_callback(execution_count, format_dict, metadata_dict)
-                    except Exception as e:
-                        print(f"Error in display hook callback: {e}")
-            else:
-                # Fallback if no formatter available
-                if self.js_callback:
-                    try:
-                        execution_count = getattr(self.shell, "execution_count", 0)
-                        self.js_callback(execution_count, result, None)
-                    except Exception as e:
-                        print(f"Error in display hook callback: {e}")
+        # Most statements produce no value; skip everything for them
+        if result is None:
+            return
+
+        # Auto-show matplotlib plots if result is a matplotlib object
+        try:
+            self._auto_show_matplotlib_if_needed(result)
+        except Exception as e:
+            print(f"Error in matplotlib auto-show: {e}")
+
+        js_callback = self.js_callback
+        shell = self.shell
+        display_format = self._format or self._bind_format()
+
+        # Use IPython's formatters to get properly formatted display data
+        if display_format is not None:
+            format_dict, metadata_dict = display_format(result)
+
+            # Call our JavaScript callback with formatted data
+            if js_callback is not _noop_callback:
+                try:
+                    execution_count = getattr(shell, "execution_count", 0)
+                    js_callback(execution_count, format_dict, metadata_dict)
+                except Exception as e:
+                    print(f"Error in display hook callback: {e}")
+        else:
+            # Fallback if no formatter available
+            if js_callback is not _noop_callback:
+                try:
+                    execution_count = getattr(shell, "execution_count", 0)
+                    js_callback(execution_count, result, None)
+                except Exception as e:
+                    print(f"Error in display hook callback: {e}")
 
     def _auto_show_matplotlib_if_needed(self, result):
         """Automatically show matplotlib plot if result is a matplotlib object"""
+        # Results can only be plots once pyplot is in use; avoid importing it
+        plt = sys.modules.get("matplotlib.pyplot")
+        if plt is None:
+            return
+
         try:
-            import matplotlib.pyplot as plt
             import matplotlib.axes
 
             # Check if result is a matplotlib Axes or contains matplotlib objects
@@ -133,6 +151,98 @@ class RichDisplayHook(DisplayHook):
             print(f"Warning: Error in matplotlib auto-show: {e}")
 
 
+# Hooks to run once a module has been imported, keyed by module name
+_post_import_hooks = {}
+
+
+class _PostImportLoader(importlib.abc.Loader):
+    """Loader wrapper that runs post-import hooks once the module executes"""
+
+    def __init__(self, loader):
+        self._loader = loader
+
+    def __getattr__(self, name):
+        return getattr(self._loader, name)
+
+    def create_module(self, spec):
+        return self._loader.create_module(spec)
+
+    def exec_module(self, module):
+        self._loader.exec_module(module)
+        _run_post_import_hooks(module)
+
+
+class _PostImportFinder(importlib.abc.MetaPathFinder):
+    """Meta path finder that wraps the loader of modules with pending hooks"""
+
+    def __init__(self):
+        self._resolving = set()
+
+    def find_spec(self, fullname, path=None, target=None):
+        if fullname not in _post_import_hooks or fullname in self._resolving:
+            return None
+
+        # Let the remaining finders locate the module, then wrap its loader
+        self._resolving.add(fullname)
+        try:
+            spec = importlib.util.find_spec(fullname)
+        finally:
+            self._resolving.discard(fullname)
+
+        if spec is None or spec.loader is None:
+            return None
+        spec.loader = _PostImportLoader(spec.loader)
+        return spec
+
+
+def _run_hook(hook, module):
+    try:
+        hook(module)
+    except Exception as e:
+        print(f"Warning: Failed to configure {module.__name__}: {e}")
+
+
+def _run_post_import_hooks(module):
+    for hook in _post_import_hooks.pop(module.__name__, ()):
+        _run_hook(hook, module)
+
+
+def _when_imported(name, hook):
+    """Call hook(module) once the named module is imported
+
+    Runs immediately if the module has already been imported.
+    """
+    module = sys.modules.get(name)
+    if module is not None:
+        _run_hook(hook, module)
+        return
+
+    _post_import_hooks.setdefault(name, []).append(hook)
+    if not any(isinstance(finder, _PostImportFinder) for finder in sys.meta_path):
+        sys.meta_path.insert(0, _PostImportFinder())
+
+
+def _configure_matplotlib_backend(matplotlib):
+    """Select the Agg backend for WebWorker compatibility
+
+    Runs when matplotlib itself is imported, which always happens before
+    pyplot is, so pyplot never picks a DOM-based backend.
+    """
+    matplotlib.use("Agg", force=True)
+
+
+def _configure_pyplot(plt):
+    """Configure pyplot for headless operation and inline display"""
+    plt.rcParams["figure.dpi"] = 100
+    plt.rcParams["savefig.dpi"] = 100
+    plt.rcParams["figure.facecolor"] = "white"
+    plt.rcParams["savefig.facecolor"] = "white"
+    plt.rcParams["figure.figsize"] = (8, 6)
+    plt.rcParams["axes.facecolor"] = "white"
+
+    _capture_matplotlib_show()
+
+
 def _capture_matplotlib_show():
     """Matplotlib show function with inline image capture"""
     import matplotlib.pyplot as plt
@@ -147,7 +257,10 @@ def _capture_matplotlib_show():
             fig = plt.gcf()
             if fig.get_axes():
                 # Save to PNG in memory
-                buf = io.BytesIO()
+                # Overwrite from the start rather than truncating, which would
+                # let BytesIO shrink its allocation again
+                buf = _PNG_BUF
+                buf.seek(0)
                 fig.savefig(
                     buf,
                     format="png",
@@ -155,15 +268,16 @@ def _capture_matplotlib_show():
                     bbox_inches="tight",
                     facecolor="white",
                     edgecolor="none",
+                    pil_kwargs={"compress_level": PNG_COMPRESS_LEVEL},
                 )
-                buf.seek(0)
-                img_data = buf.getvalue()
-                buf.close()
 
-                # Encode as base64
+                # Encode as base64 straight from the buffer, without copying
+                # the PNG bytes out first
                 import base64
 
-                img_base64 = base64.b64encode(img_data).decode()
+                size = buf.tell()
+                with buf.getbuffer() as view, view[:size] as png:
+                    img_base64 = base64.b64encode(png).decode("ascii")
 
                 # Create display data
                 display_data = {
@@ -180,8 +294,10 @@ def _capture_matplotlib_show():
                     # Fallback - print base64 data marker
                     print(f"IMAGE_DATA:PNG:{img_base64}")
 
-                # Clear the figure to prevent memory leaks
-                plt.clf()
+                # Close the figure, not just its axes, so the figure and its
+                # canvas are freed; plt.show() in a loop needs no manual close
+                fig.clear()
+                plt.close(fig)
         except Exception as e:
             print(f"Error capturing matplotlib plot: {e}")
             # Fall back to original behavior
@@ -191,43 +307,36 @@ def _capture_matplotlib_show():
     plt.show = enhanced_show
 
 
-def _patch_matplotlib_for_auto_display():
-    """Patch matplotlib functions to auto-display plots when created"""
-    try:
+def _patch_pandas_for_auto_display(pd):
+    """Patch pandas plotting to auto-display plots when created"""
+    original_plot = pd.DataFrame.plot
+
+    def auto_display_plot(*args, **kwargs):
+        result = original_plot(*args, **kwargs)
         import matplotlib.pyplot as plt
-        import matplotlib.axes
 
-        # Store original plotting functions
-        original_plot_functions = {}
-        plot_functions = ["plot", "scatter", "bar", "hist", "boxplot", "pie"]
+        # Check if there's a current figure with plots
+        fig = plt.gcf()
+        if fig.get_axes():
+            plt.show()  # This will trigger our enhanced_show
+        return result
 
-        for func_name in plot_functions:
-            if hasattr(plt, func_name):
-                original_plot_functions[func_name] = getattr(plt, func_name)
+    pd.DataFrame.plot = auto_display_plot
 
-        # Patch pandas plotting to auto-show
-        try:
-            import pandas as pd
 
-            original_plot = pd.DataFrame.plot
+def _configure_pandas(pd):
+    """Configure pandas display options for better formatting"""
+    pd.set_option("display.max_columns", 20)
+    pd.set_option("display.max_rows", 100)
+    pd.set_option("display.width", None)
+    pd.set_option("display.max_colwidth", 50)
 
-            def auto_display_plot(*args, **kwargs):
-                result = original_plot(*args, **kwargs)
-                # Check if there's a current figure with plots
-                fig = plt.gcf()
-                if fig.get_axes():
-                    plt.show()  # This will trigger our enhanced_show
-                return result
+    _patch_pandas_for_auto_display(pd)
 
-            pd.DataFrame.plot = auto_display_plot
-            print("Patched pandas plotting for auto-display")
-        except ImportError:
-            pass
-        except Exception as e:
-            print(f"Warning: Could not patch pandas plotting: {e}")
 
-    except Exception as e:
-        print(f"Error patching matplotlib for auto-display: {e}")
+def _configure_numpy(np):
+    """Configure numpy display options"""
+    np.set_printoptions(threshold=100, edgeitems=3, linewidth=120)
 
 
 # Default callback implementations
@@ -253,36 +362,14 @@ js_clear_callback = default_clear_callback
 
 
 def setup_rich_formatters():
-    """Set up rich display formatters for various data types"""
-    try:
-        # Set up matplotlib integration (backend already configured at module level)
-        _capture_matplotlib_show()
-        _patch_matplotlib_for_auto_display()
-        print("Matplotlib display support enabled with auto-capture")
-    except ImportError:
-        print("Matplotlib not available, skipping plot capture setup")
-
-    try:
-        # Set up pandas formatting if available
-        import pandas as pd
-
-        # Configure pandas display options for better formatting
-        pd.set_option("display.max_columns", 20)
-        pd.set_option("display.max_rows", 100)
-        pd.set_option("display.width", None)
-        pd.set_option("display.max_colwidth", 50)
-        print("Pandas options set")
-    except ImportError:
-        pass  # Pandas not available
-
-    try:
-        # Set up numpy formatting if available
-        import numpy as np
-
-        # Configure numpy display options
-        np.set_printoptions(threshold=100, edgeitems=3, linewidth=120)
-        print("Numpy display support enabled")
-    except ImportError:
-        pass  # NumPy not available
+    """Set up rich display formatters for various data types
+
+    Importing matplotlib, pandas and numpy is a large share of worker startup,
+    so each is configured when user code first imports it rather than here.
+    """
+    _when_imported("matplotlib", _configure_matplotlib_backend)
+    _when_imported("matplotlib.pyplot", _configure_pyplot)
+    _when_imported("pandas", _configure_pandas)
+    _when_imported("numpy", _configure_numpy)
 
     print("Rich formatters setup complete")
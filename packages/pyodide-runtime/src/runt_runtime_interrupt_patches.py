@@ -15,6 +15,9 @@ import builtins
 _original_sleep = None
 _original_input = None
 
+# Pyodide's checkInterrupt, resolved once by setup_interrupt_patches()
+_do_check = None
+
 
 def _signal_handler(signum, frame):
     """Enhanced signal handler with proper interrupt support"""
@@ -24,15 +27,26 @@ def _signal_handler(signum, frame):
         raise KeyboardInterrupt("Interrupted by user")
 
 
-def _check_interrupt():
-    """Check for interrupt requests from the worker"""
+def _resolve_interrupt_check():
+    """Look up Pyodide's interrupt check once instead of on every call"""
+    global _do_check
+
     try:
         # Import here to avoid circular imports
         import js
 
-        # Check if pyodide interrupt buffer indicates an interrupt
-        if hasattr(js, "pyodide") and hasattr(js.pyodide, "checkInterrupt"):
-            js.pyodide.checkInterrupt()
+        _do_check = getattr(getattr(js, "pyodide", None), "checkInterrupt", None)
+    except Exception:
+        _do_check = None
+
+
+def _check_interrupt():
+    """Check for interrupt requests from the worker"""
+    if _do_check is None:
+        return
+    try:
+        # Raises if the pyodide interrupt buffer indicates an interrupt
+        _do_check()
     except Exception:
         # If interrupt checking fails, just continue
         pass
@@ -40,17 +54,22 @@ def _check_interrupt():
 
 def _interrupt_aware_sleep(duration):
     """Sleep function that can be interrupted"""
-    global _original_sleep
+    # Pyodide only raises KeyboardInterrupt from checkInterrupt, not from inside
+    # a native sleep, so sleep in short chunks and check between them.
+    # Interrupt latency is bounded by the chunk size.
+    original_sleep = _original_sleep
+    monotonic = time.monotonic
 
-    start_time = time.time()
-    end_time = start_time + duration
+    _check_interrupt()
+    if duration <= 0:
+        return
 
-    while time.time() < end_time:
+    end_time = monotonic() + duration
+    remaining = duration
+    while remaining > 0:
+        original_sleep(min(0.1, remaining))
         _check_interrupt()
-        remaining = end_time - time.time()
-        if remaining > 0:
-            # Sleep in small chunks to allow interrupt checking
-            _original_sleep(min(0.1, remaining))
+        remaining = end_time - monotonic()
 
 
 def _interrupt_aware_input(prompt=""):
@@ -99,6 +118,9 @@ def setup_interrupt_patches():
     # Store original functions to prevent double-patching
     _store_original_functions()
 
+    # Resolve the interrupt hook used by the patched functions
+    _resolve_interrupt_check()
+
     # Set up signal handlers
     _setup_signal_handlers()
 
@@ -6,6 +6,8 @@ Original from https://github.com/rgbkrk/chatlab/blob/main/chatlab/registry.py
 import asyncio
 import inspect
 import json
+import logging
+import traceback
 
 from typing import (
     Any,
@@ -22,11 +24,18 @@ from typing import (
     cast,
     get_args,
     get_origin,
+    get_type_hints,
     overload,
 )
 
 from pydantic import BaseModel, Field, create_model
 
+logger = logging.getLogger(__name__)
+
+# Shared encoder for tool payloads; json.dumps builds a new one per call when
+# given non-default options
+_JSON_ENCODER = json.JSONEncoder(default=str, separators=(",", ":"))
+
 FunctionParameters: TypeAlias = Dict[str, object]
 
 
@@ -116,10 +125,44 @@ class FunctionSchemaConfig:
     arbitrary_types_allowed = True
 
 
+def _resolve_type_hints(function: Callable) -> dict:
+    """Resolve a function's annotations, including string annotations from
+    `from __future__ import annotations`, keeping Annotated metadata.
+
+    Falls back to an empty mapping (callers then use the raw annotations)
+    when an annotation can't be resolved.
+    """
+    try:
+        return get_type_hints(function, include_extras=True)
+    except (NameError, TypeError):
+        return {}
+
+
+def extract_parameter_specs(
+    function: Callable,
+) -> list[tuple[str, Optional[Type[BaseModel]]]]:
+    """Resolve a function's parameters once for argument preparation.
+
+    Returns (name, model) pairs where model is the pydantic model to validate
+    the argument into, or None when the raw JSON value is passed through.
+    """
+    hints = _resolve_type_hints(function)
+    specs = []
+    for param_name, param in inspect.signature(function).parameters.items():
+        param_type = hints.get(param_name, param.annotation)
+        if inspect.isclass(param_type) and issubclass(param_type, BaseModel):
+            specs.append((param_name, param_type))
+        else:
+            specs.append((param_name, None))
+    return specs
+
+
 def extract_model_from_function(func_name: str, function: Callable) -> Type[BaseModel]:
     # extract function parameters and their type annotations
     sig = inspect.signature(function)
 
+    hints = _resolve_type_hints(function)
+
     fields = {}
     required_fields = []
     for name, param in sig.parameters.items():
@@ -133,7 +176,7 @@ def extract_model_from_function(func_name: str, function: Callable) -> Type[Base
             raise Exception(
                 f"`{name}` parameter of {func_name} must have a JSON-serializable type annotation"
             )
-        type_annotation = param.annotation
+        type_annotation = hints.get(name, param.annotation)
 
         default_value: Any = ...
 
@@ -147,7 +190,7 @@ def extract_model_from_function(func_name: str, function: Callable) -> Type[Base
         if get_origin(type_annotation) is Union:
             args = get_args(type_annotation)
             if len(args) == 2 and type(None) in args:
-                type_annotation = next(arg for arg in args if arg is not type(None))
+                type_annotation = args[1] if args[0] is type(None) else args[0]
                 default_value = None
 
         fields[name] = (
@@ -186,13 +229,14 @@ def generate_function_schema(
         model = extract_model_from_function(func_name, function)
         parameters: dict = model.model_json_schema()  # type: ignore
 
-    if "properties" not in parameters:
-        parameters["properties"] = {}
-
-    # remove "title" since it's unused by OpenAI
-    parameters.pop("title", None)
-    for field_name in parameters["properties"].keys():
-        parameters["properties"][field_name].pop("title", None)
+    # remove "title" since it's unused by OpenAI. Build fresh dicts rather than
+    # popping in place so a caller-supplied schema is left untouched.
+    properties = parameters.get("properties", {})
+    parameters = {key: value for key, value in parameters.items() if key != "title"}
+    parameters["properties"] = {
+        field_name: {key: value for key, value in field.items() if key != "title"}
+        for field_name, field in properties.items()
+    }
 
     if "required" not in parameters:
         parameters["required"] = []
@@ -210,6 +254,9 @@ class FunctionRegistry:
 
     __functions: dict[str, Callable]
     __schemas: dict[str, FunctionDefinition]
+    __argument_adapters: dict[str, Callable[[Optional[str]], dict]]
+    __is_async: dict[str, bool]
+    __tools_json: Optional[str]
 
     # Allow passing in a callable that accepts a single string for the python
     # hallucination function. This is useful for testing.
@@ -219,6 +266,9 @@ class FunctionRegistry:
         """Initialize a FunctionRegistry object."""
         self.__functions = {}
         self.__schemas = {}
+        self.__argument_adapters = {}
+        self.__is_async = {}
+        self.__tools_json = None
 
     def decorator(
         self, parameter_schema: Optional[Union[Type["BaseModel"], dict]] = None
@@ -286,6 +336,11 @@ class FunctionRegistry:
 
         self.__functions[function.__name__] = function
         self.__schemas[function.__name__] = final_schema
+        self.__argument_adapters[function.__name__] = make_argument_adapter(
+            function.__name__, function
+        )
+        self.__is_async[function.__name__] = asyncio.iscoroutinefunction(function)
+        self.__tools_json = None
 
         return final_schema
 
@@ -320,9 +375,9 @@ class FunctionRegistry:
         function = possible_function
 
         # TODO: Use the model extractor here
-        prepared_arguments = extract_arguments(name, function, arguments)
+        prepared_arguments = self.__argument_adapters[name](arguments)
 
-        if asyncio.iscoroutinefunction(function):
+        if self.__is_async[name]:
             result = await function(**prepared_arguments)
         else:
             result = function(**prepared_arguments)
@@ -337,40 +392,72 @@ class FunctionRegistry:
         """Get a list of function definitions."""
         return list(self.__schemas.values())
 
+    @property
+    def tools_json(self) -> str:
+        """Get the registered tools in NotebookTool format as a JSON string.
+
+        The result is cached until the next registration.
+        """
+        if self.__tools_json is None:
+            tools = [
+                {
+                    "name": definition["name"],
+                    "description": definition.get("description", ""),
+                    "parameters": definition.get("parameters", {}),
+                }
+                for definition in self.__schemas.values()
+            ]
+            self.__tools_json = _JSON_ENCODER.encode(tools)
+        return self.__tools_json
+
 
 def extract_arguments(name: str, function: Callable, arguments: Optional[str]) -> dict:
-    print(
-        f"[DEBUG extract_arguments] name={name}, arguments={arguments!r}, type={type(arguments)}"
-    )
+    return _prepare_arguments(name, arguments, extract_parameter_specs(function))
+
+
+def make_argument_adapter(
+    name: str, function: Callable
+) -> Callable[[Optional[str]], dict]:
+    """Build a callable that turns a JSON arguments string into call kwargs.
+
+    The function's parameters are resolved here, once, so calling the adapter
+    does no introspection.
+    """
+    parameter_specs = extract_parameter_specs(function)
+
+    def adapt(arguments: Optional[str]) -> dict:
+        return _prepare_arguments(name, arguments, parameter_specs)
+
+    return adapt
+
+
+def _prepare_arguments(
+    name: str,
+    arguments: Optional[str],
+    parameter_specs: list[tuple[str, Optional[Type[BaseModel]]]],
+) -> dict:
+    logger.debug("extract_arguments name=%s, arguments=%r", name, arguments)
     dict_arguments = {}
     if arguments is not None and arguments != "":
         try:
             dict_arguments = json.loads(arguments)
-            print(
-                f"[DEBUG extract_arguments] After JSON parsing: dict_arguments={dict_arguments!r}, type={type(dict_arguments)}"
-            )
+            logger.debug("extract_arguments parsed arguments=%r", dict_arguments)
         except json.JSONDecodeError as e:
-            print(f"[DEBUG extract_arguments] JSON decode error: {e}")
+            logger.debug("extract_arguments JSON decode error: %s", e)
             raise FunctionArgumentError(
                 f"Invalid Function call on {name}. Arguments must be a valid JSON object"
             )
 
-    prepared_arguments = {}
-
-    for param_name, param in inspect.signature(function).parameters.items():
-        param_type = param.annotation
-        print(
-            f"[DEBUG extract_arguments] Processing param {param_name}, dict_arguments type={type(dict_arguments)}"
+    # Deserialize JSON into the parameter's Pydantic model if it has one
+    get = dict_arguments.get
+    return {
+        param_name: (
+            model.model_validate(get(param_name))
+            if model is not None
+            else cast(Any, get(param_name))
         )
-        arg_value = dict_arguments.get(param_name)
-
-        # Check if parameter type is a subclass of BaseModel and deserialize JSON into Pydantic model
-        if inspect.isclass(param_type) and issubclass(param_type, BaseModel):
-            prepared_arguments[param_name] = param_type.model_validate(arg_value)
-        else:
-            prepared_arguments[param_name] = cast(Any, arg_value)
-
-    return prepared_arguments
+        for param_name, model in parameter_specs
+    }
 
 
 # Create the global function registry instance
@@ -395,29 +482,8 @@ def tool(func) -> Callable:
 
 def get_registered_tools():
     """Get all registered tools as JSON string (compatible with existing API)"""
-    import json
-
-    print(
-        f"[DEBUG] Registry has {len(function_registry.function_definitions)} function definitions"
-    )
-
-    # Convert FunctionDefinition format to NotebookTool format
-    tools = []
-    for i, definition in enumerate(function_registry.function_definitions):
-        print(f"[DEBUG] Processing definition {i}: {definition}")
-
-        # Return the function definition directly (NotebookTool format)
-        tool_spec = {
-            "name": definition["name"],
-            "description": definition.get("description", ""),
-            "parameters": definition.get("parameters", {}),
-        }
-        print(f"[DEBUG] Created tool_spec {i}: {tool_spec}")
-        tools.append(tool_spec)
-
-    print(f"[DEBUG] Final tools array: {tools}")
-    result = json.dumps(tools, default=str)
-    print(f"[DEBUG] JSON result: {result}")
+    result = function_registry.tools_json
+    logger.debug("get_registered_tools result: %s", result)
     return result
 
 
@@ -429,7 +495,7 @@ async def run_registered_tool(toolName: str, kwargs_string: str):
 
         # Ensure result is JSON serializable string
         if not isinstance(result, str):
-            result = json.dumps(result, default=str)
+            result = _JSON_ENCODER.encode(result)
 
         return result
 
@@ -440,17 +506,16 @@ async def run_registered_tool(toolName: str, kwargs_string: str):
         print(f"[TOOL_ERROR] Error running tool {toolName}: {e}")
         raise
     except Exception as e:
-        # Capture and format any other Python exceptions from tool execution
-        import traceback
-        import sys
-
-        # Format the full traceback for debugging
-        tb_str = traceback.format_exc()
+        # Capture and format any other Python exceptions from tool execution.
+        # Only the 20 frames nearest the raise are kept, since formatting reads
+        # source lines for every frame.
+        tb_str = "".join(
+            traceback.TracebackException.from_exception(
+                e, limit=-20, capture_locals=False
+            ).format()
+        )
         error_msg = f"Tool '{toolName}' execution failed with error: {str(e)}"
 
-        # Print the full traceback to stderr for logging
-        print(f"[TOOL_ERROR] {error_msg}", file=sys.stderr)
-        print(f"[TOOL_TRACEBACK] {tb_str}", file=sys.stderr)
-
-        # Raise a clear error that includes the Python error details
+        # Raise a clear error that includes the Python error details; the
+        # worker logs it, so it isn't also printed here
         raise Exception(f"{error_msg}\n\nPython traceback:\n{tb_str}")
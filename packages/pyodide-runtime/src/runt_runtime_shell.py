@@ -8,10 +8,12 @@ runt working with an interactive Python environment.
 """
 
 import os
+import traceback
 
 
 from IPython.core.interactiveshell import InteractiveShell
-from IPython.core.history import HistoryManager
+from IPython.core.history import DummyDB, HistoryManager
+from traitlets.config import Config
 
 from runt_runtime_display import (
     RichDisplayHook,
@@ -31,22 +33,32 @@ class LiteHistoryManager(HistoryManager):
 
     def __init__(self, shell=None, config=None, **traits):
         self.enabled = False
+        self.hist_file = ":memory:"
         super().__init__(shell=shell, config=config, **traits)
 
+    def init_db(self):
+        """Skip connecting to SQLite; history is never persisted"""
+        self.db = DummyDB()
 
-# Set up environment for rich terminal output
-os.environ.update(
-    {
-        "TERM": "xterm-256color",
-        "FORCE_COLOR": "1",
-        "COLORTERM": "truecolor",
-        "CLICOLOR": "1",
-        "CLICOLOR_FORCE": "1",
-    }
-)
+    def writeout_cache(self, conn=None):
+        pass
+
+    def store_output(self, line_num):
+        pass
+
+    def end_session(self):
+        pass
+
+
+# The shell builds its own history manager before it is overridden below, so
+# keep that one off SQLite (and Pyodide's emulated filesystem) as well
+_shell_config = Config()
+_shell_config.HistoryManager.enabled = False
+_shell_config.HistoryManager.hist_file = ":memory:"
 
 # Create pseudo-IPython shell instance with enhanced display capabilities
 shell = InteractiveShell.instance(
+    config=_shell_config,
     displayhook_class=RichDisplayHook,
     display_pub_class=RichDisplayPublisher,
 )
@@ -55,11 +67,31 @@ shell = InteractiveShell.instance(
 shell.history_manager = LiteHistoryManager(shell=shell, parent=shell)
 
 
+# Environment for rich terminal output
+_RICH_ENV = {
+    "TERM": "xterm-256color",
+    "FORCE_COLOR": "1",
+    "COLORTERM": "truecolor",
+    "CLICOLOR": "1",
+    "CLICOLOR_FORCE": "1",
+}
+
+
+def _setup_env():
+    """Set up environment for rich terminal output
+
+    Only variables whose value differs are written, so repeated calls don't
+    write to the environment again.
+    """
+    environ = os.environ
+    for key, value in _RICH_ENV.items():
+        if environ.get(key) != value:
+            environ[key] = value
+
+
 def format_exception(exc_type, exc_value, exc_traceback):
     """Enhanced exception formatting with rich output"""
     try:
-        import traceback
-
         # Format the traceback
         tb_lines = traceback.format_exception(exc_type, exc_value, exc_traceback)
 
@@ -75,17 +107,19 @@ def format_exception(exc_type, exc_value, exc_traceback):
 def initialize_ipython_environment():
     """Initialize the pseudo-IPython sandbox environment with all setup functions"""
 
+    # Set up environment for rich terminal output
+    _setup_env()
+
     # Set up display callbacks on the shell's display publisher and hook
-    if hasattr(shell, "display_pub") and hasattr(shell.display_pub, "js_callback"):
-        shell.display_pub.js_callback = js_display_callback
+    display_pub = getattr(shell, "display_pub", None)
+    displayhook = getattr(shell, "displayhook", None)
 
-    if hasattr(shell, "displayhook") and hasattr(shell.displayhook, "js_callback"):
-        shell.displayhook.js_callback = js_execution_callback
+    if display_pub is not None:
+        display_pub.js_callback = js_display_callback
+        display_pub.js_clear_callback = js_clear_callback
 
-    if hasattr(shell, "display_pub") and hasattr(
-        shell.display_pub, "js_clear_callback"
-    ):
-        shell.display_pub.js_clear_callback = js_clear_callback
+    if displayhook is not None:
+        displayhook.js_callback = js_execution_callback
 
     # Apply rich formatters
     setup_rich_formatters()